@@ -1,22 +1,407 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import numpy_financial as npf
+import openpyxl
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
 import plotly.express as px
 px.defaults.template = "plotly_white"
 from datetime import datetime
-from fpdf import FPDF
+from concurrent.futures import ThreadPoolExecutor
 import io
-
-
+import os
+import hashlib
+import tempfile
+import getpass
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # fall back to openpyxl's read-only reader
+    CalamineWorkbook = None
+
+# Optional extra, deliberately not in requirements.txt:
+#   pip install dataframe_image matplotlib
+# With it, long PDF tables are rasterised a page at a time; without it they
+# are drawn as fpdf2 cells.
+try:
+    import dataframe_image as dfi
+except ImportError:
+    dfi = None
+
+# Past this many rows the PDF table is rasterised a page at a time
+PDF_TABLE_IMAGE_MIN_ROWS = 50
+PDF_TABLE_ROWS_PER_IMAGE = 30
+
+# Part of the on-disk prepared-frame cache key
+PREPARED_CACHE_VERSION = 1
+
+
+# x == x is False only for NaN; cheaper than pd.notnull's scalar dispatch
 def format_currency(x):
-    return f"${x:,.0f}" if pd.notnull(x) else "N/A"
+    return f"${x:,.0f}" if x is not None and x == x else "N/A"
 
 def format_percent(x, decimals=2):
-    return f"{x:.{decimals}%}" if pd.notnull(x) else "N/A"
+    return f"{x:.{decimals}%}" if x is not None and x == x else "N/A"
 
 def format_multiple(x):
-    return f"{x:.2f}x" if pd.notnull(x) else "N/A"
+    return f"{x:.2f}x" if x is not None and x == x else "N/A"
+
+# Column-at-once variants of the scalar formatters above, for whole tables
+def format_currency_column(values):
+    return "$" + values.round().astype("int64").map("{:,}".format)
+
+def format_float_column(values, template):
+    # printf-style template applied in one numpy pass; NaN cells become "N/A"
+    values = values.to_numpy(dtype=np.float64)
+    return np.where(np.isnan(values), "N/A", np.char.mod(template, values))
+
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%Y/%m/%d")
+
+def parse_dates(values):
+    # Excel date cells already arrive as datetimes; only text dates need parsing
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    # Explicit formats take pandas' C strptime path and cache=True parses
+    # each distinct date string once; the inferring parser is the last resort
+    expected = values.notna().sum()
+    for fmt in DATE_FORMATS:
+        parsed = pd.to_datetime(values, format=fmt, errors="coerce", cache=True)
+        if parsed.notna().sum() >= expected:
+            return parsed
+    return pd.to_datetime(values, errors="coerce", cache=True)
+
+def sum_by_key(keys, *columns):
+    # Sorted unique keys plus one bincount pass per column, no hash groupby
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    return uniq, [np.bincount(inverse, weights=col, minlength=len(uniq)) for col in columns]
+
+def top_k_names(values, names, k=3):
+    # np.partition finds the k-th largest value in O(n); only rows at or above it
+    # are then ordered, ties by row position. Callers drop NaN first, since it
+    # partitions as largest
+    k = min(k, len(values))
+    if k == 0:
+        return []
+    cutoff = np.partition(values, len(values) - k)[len(values) - k]
+    idx = np.flatnonzero(values >= cutoff)
+    idx = idx[np.lexsort((idx, -values[idx]))][:k]
+    return names[idx].tolist()
+
+# Colour bins: 0 red below the first edge, 1 yellow, 2 green at or above the second
+COLOR_EDGES = {"MOIC": (1.0, 2.0), "ROI": (0.10, 0.20), "Annualized ROI": (0.10, 0.20)}
+# Decimals each column is shown at (MOIC "2.00x", percents "20.00%"); values are
+# rounded to them before binning so the colour matches the displayed number
+COLOR_DECIMALS = {"MOIC": 2, "ROI": 4, "Annualized ROI": 4}
+
+def color_bins(values, edges, decimals):
+    # NaN gets -1 so callers can index "no colour" from the end of their palette
+    values = np.round(np.asarray(values, dtype=np.float64), decimals)
+    return np.where(np.isnan(values), -1, np.digitize(values, edges))
+
+def floor_dates(dates, unit="M"):
+    # A datetime64 unit cast truncates to the period start without Period objects
+    return dates.to_numpy(dtype=f"datetime64[{unit}]")
+
+def header_labels(header):
+    # Match pd.read_excel: blank headers, None or "", become "Unnamed: i" and
+    # repeats get ".1", ".2", ... so every column label stays unique
+    labels = [name.strip() if isinstance(name, str) else name for name in header]
+    labels = [f"Unnamed: {i}" if label is None or label == "" else label for i, label in enumerate(labels)]
+    counts = {}
+    for i, label in enumerate(labels):
+        count = counts.get(label, 0)
+        while count > 0:
+            counts[label] = count + 1
+            label = f"{label}.{count}"
+            count = counts.get(label, 0)
+        labels[i] = label
+        counts[label] = count + 1
+    return labels
+
+@st.cache_data(show_spinner=False)
+def load_workbook(file_bytes):
+    # Keyed on the raw upload bytes so widget reruns skip the XLSX parse.
+    # calamine parses the sheet in Rust; openpyxl's read_only mode streams
+    # the sheet XML once instead of building the full DOM.
+    if CalamineWorkbook is not None:
+        rows = CalamineWorkbook.from_filelike(io.BytesIO(file_bytes)).get_sheet_by_index(0).to_python()
+    else:
+        wb = openpyxl.load_workbook(io.BytesIO(file_bytes), read_only=True, data_only=True)
+        try:
+            rows = list(wb.worksheets[0].iter_rows(values_only=True))
+        finally:
+            wb.close()
+    if not rows:
+        return pd.DataFrame()
+    df = pd.DataFrame.from_records(rows[1:], columns=header_labels(rows[0]))
+    if CalamineWorkbook is not None:
+        # calamine reports blank cells as "" where openpyxl gives None
+        df = df.mask(df.eq("")).infer_objects()
+    return df
+
+def prepare_investments(df, today):
+    # Coerce once up front; values that survive a float32 round-trip are
+    # stored at half the width for every downstream sum/groupby pass
+    for col in ("Cost", "Fair Value", "Realized Value"):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce", downcast="float")
+    df = df.dropna(subset=["Cost", "Fair Value", "Date"])
+    df = df.assign(Date=parse_dates(df["Date"])).dropna(subset=["Date"])
+
+    # Derived metrics are built on the raw arrays and attached in one assign.
+    # Zero-cost rows get NaN rather than inf so they drop out of rankings
+    cost = df["Cost"].to_numpy(dtype=np.float64)
+    fair_value = df["Fair Value"].to_numpy(dtype=np.float64)
+    moic = np.divide(fair_value, cost, out=np.full_like(cost, np.nan), where=cost != 0)
+    roi = np.divide(fair_value - cost, cost, out=np.full_like(cost, np.nan), where=cost != 0)
+
+    # Day-resolution datetime64 subtraction; no Timedelta boxing or .dt access
+    today = np.datetime64(today, "D")
+    years_held = (today - df["Date"].to_numpy(dtype="datetime64[D]")).astype(np.int64) / 365.25
+    inv_years = np.divide(1.0, years_held, out=np.full_like(years_held, np.nan), where=years_held > 0)
+    # A negative MOIC has no real root; let it come out NaN without a RuntimeWarning
+    with np.errstate(invalid="ignore"):
+        annualized_roi = np.where(years_held > 0, np.power(moic, inv_years) - 1.0, np.nan)
+
+    # Ratios are computed in float64 and stored as float32: ~7 significant digits
+    # is plenty for display and halves the bytes every later pass moves
+    df = df.assign(**{
+        "MOIC": moic.astype(np.float32),
+        "ROI": roi.astype(np.float32),
+        "Years Held": years_held.astype(np.float32),
+        "Annualized ROI": annualized_roi.astype(np.float32),
+    })
+
+    # Low-cardinality labels as categoricals: int-code isin/groupby, and the
+    # fund list comes pre-deduplicated from the categories
+    for col in ("Fund Name", "Stage", "Sector", "Geography"):
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    # Status is normalised once here; filters then compare category codes
+    if "Realized / Unrealized" in df.columns:
+        df["Realized / Unrealized"] = pd.Categorical(
+            df["Realized / Unrealized"].astype(str).str.strip().str.lower(),
+            categories=["realized", "unrealized"],
+        )
+    # Arrow-backed strings so the name search runs as a C++ substring kernel
+    df["Investment Name"] = df["Investment Name"].astype("string[pyarrow]")
+    return df
+
+def prepared_cache_dir():
+    # Per-user directory so other accounts on the host can't read or plant cache files
+    user = os.getuid() if hasattr(os, "getuid") else getpass.getuser()
+    return os.path.join(tempfile.gettempdir(), f"investment-dashboard-{user}")
+
+def prepared_cache_path(file_bytes, today):
+    # Keyed on content and day, since Years Held and Annualized ROI move with today.
+    # Bump PREPARED_CACHE_VERSION whenever prepare_investments changes its output.
+    digest = hashlib.sha1(file_bytes).hexdigest()
+    name = f"investments-v{PREPARED_CACHE_VERSION}-{digest}-{today:%Y%m%d}.parquet"
+    return os.path.join(prepared_cache_dir(), name)
+
+def read_prepared_cache(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        df = pd.read_parquet(path, engine="pyarrow")
+    except Exception:  # unreadable file, treat as a miss
+        return None
+    # Parquet keeps "string" but not its storage; restore the Arrow backing
+    df["Investment Name"] = df["Investment Name"].astype("string[pyarrow]")
+    return df
+
+def write_prepared_cache(path, df, today):
+    cache_dir = os.path.dirname(path)
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        if hasattr(os, "getuid") and os.stat(cache_dir).st_uid != os.getuid():
+            return  # someone else owns the directory; don't write into it
+        # mkstemp creates the file 0600; write then rename so a concurrent
+        # session never reads a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        os.close(fd)
+    except OSError:
+        return
+    try:
+        df.to_parquet(tmp_path, engine="pyarrow", index=False)
+        os.replace(tmp_path, path)
+    except Exception:  # e.g. mixed-type extra columns; skip the disk cache
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+    # Files from earlier days are never read again; other uploads from today
+    # stay, since every session on the server shares this directory
+    today_suffix = f"-{today:%Y%m%d}.parquet"
+    for name in os.listdir(cache_dir):
+        if name.startswith("investments-") and name.endswith(".parquet") and not name.endswith(today_suffix):
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except OSError:
+                pass
+
+REQUIRED_COLUMNS = {"Investment Name", "Cost", "Fair Value", "Date", "Fund Name"}
+
+@st.cache_data(show_spinner=False)
+def load_investments(file_bytes, manual_entries, today):
+    # Keyed on the upload bytes, the manual rows and the day instead of on a
+    # frame, which st.cache_data only samples past 50k rows. The day is part of
+    # the key because Years Held and Annualized ROI move with it.
+    # Only on an in-memory miss: uploads without manual rows can reuse a frame
+    # prepared by an earlier session from the disk cache
+    cache_path = None if manual_entries else prepared_cache_path(file_bytes, today)
+    if cache_path:
+        df = read_prepared_cache(cache_path)
+        if df is not None:
+            return df
+    df = load_workbook(file_bytes)
+    # Only pay for the concat copy when there is something to append
+    if manual_entries:
+        df = pd.concat([df, pd.DataFrame(manual_entries)], ignore_index=True)
+    if not REQUIRED_COLUMNS <= set(df.columns):
+        return df  # returned unprepared; the caller reports the missing columns
+    df = prepare_investments(df, today)
+    if cache_path:
+        write_prepared_cache(cache_path, df, today)
+    return df
+
+def hash_frame(df):
+    # Content fingerprint for st.cache_data; hash_pandas_object runs in C
+    return tuple(df.columns), pd.util.hash_pandas_object(df, index=True).values.tobytes()
+
+FRAME_HASH = {pd.DataFrame: hash_frame}
+
+@st.cache_data(show_spinner=False, hash_funcs=FRAME_HASH)
+def summarize_by_fund(df):
+    # One groupby feeds all three fund charts. ROI is weighted by cost over the
+    # rows that have an annualized ROI, so positions held under a day don't
+    # dilute the average; all-NaN funds end up with a zero weight
+    annualized = df["Annualized ROI"].to_numpy(dtype=np.float64)
+    cost = df["Cost"].to_numpy(dtype=np.float64)
+    has_roi = ~np.isnan(annualized)
+    weighted = df[["Fund Name", "Cost", "Fair Value"]].assign(**{
+        "ROI Contribution": np.where(has_roi, annualized * cost, 0.0),
+        "ROI Weight": np.where(has_roi, cost, 0.0),
+    })
+    return weighted.groupby("Fund Name", observed=True).sum()
+
+@st.cache_data(show_spinner=False, hash_funcs=FRAME_HASH)
+def build_moic_by_fund_fig(fund_sums):
+    moic_by_fund = (fund_sums["Fair Value"] / fund_sums["Cost"]).reset_index(name="Portfolio MOIC")
+    moic_by_fund["MOIC Label"] = moic_by_fund["Portfolio MOIC"].round(2).astype(str) + "x"
+    return px.bar(moic_by_fund, x="Fund Name", y="Portfolio MOIC", title="MOIC per Fund", text="MOIC Label")
+
+@st.cache_data(show_spinner=False, hash_funcs=FRAME_HASH)
+def build_roi_by_fund_fig(fund_sums):
+    roi_fund = (fund_sums["ROI Contribution"] / fund_sums["ROI Weight"].replace(0, np.nan)).reset_index(name="Weighted Annualized ROI")
+    roi_fund["Annualized ROI Label"] = roi_fund["Weighted Annualized ROI"].map(lambda x: format_percent(x, 1))
+    return px.bar(
+        roi_fund,
+        x="Fund Name",
+        y="Weighted Annualized ROI",
+        title="Weighted Annualized ROI per Fund",
+        text="Annualized ROI Label"
+    )
+
+@st.cache_data(show_spinner=False, hash_funcs=FRAME_HASH)
+def build_allocation_fig(fund_sums):
+    pie_df = fund_sums["Cost"].reset_index()
+    return px.pie(pie_df, names="Fund Name", values="Cost", title="Capital Invested per Fund")
+
+@st.cache_data(show_spinner=False, hash_funcs=FRAME_HASH)
+def build_stage_fig(df):
+    stage_df = df.groupby("Stage", observed=True)["Cost"].sum().reset_index()
+    return px.pie(stage_df, names="Stage", values="Cost", title="Investments by Stage")
+
+@st.cache_data(show_spinner=False, hash_funcs=FRAME_HASH)
+def build_timeline_fig(df):
+    date_groups = floor_dates(df["Date"])
+    group_keys, (group_cost, group_value) = sum_by_key(
+        date_groups, df["Cost"].to_numpy(dtype=np.float64), df["Fair Value"].to_numpy(dtype=np.float64)
+    )
+    cost_value_df = pd.DataFrame({"Date Group": group_keys, "Cost": group_cost.cumsum(), "Fair Value": group_value.cumsum()})
+    return px.line(cost_value_df, x="Date Group", y=["Cost", "Fair Value"], title="Cumulative Cost vs Fair Value Over Time", )
+
+@st.cache_data(show_spinner=False, hash_funcs=FRAME_HASH)
+def build_monthly_fig(df):
+    months = floor_dates(df["Date"])
+    month_keys, (month_cost,) = sum_by_key(months, df["Cost"].to_numpy(dtype=np.float64))
+    monthly_df = pd.DataFrame({"Month": month_keys, "Cost": month_cost})
+    return px.bar(monthly_df, x="Month", y="Cost", title="Monthly Deployed", )
+
+@st.cache_data(show_spinner=False, hash_funcs=FRAME_HASH)
+def build_search_fig(df):
+    search_chart_df = df.groupby("Investment Name")[["Cost", "Fair Value"]].sum().reset_index().melt(
+        id_vars="Investment Name",
+        var_name="Metric",
+        value_name="Amount"
+    )
+    return px.bar(
+        search_chart_df,
+        x="Investment Name",
+        y="Amount",
+        color="Metric",
+        barmode="group",
+        title="Cost vs Fair Value for Selected Investments",
+        
+    )
+
+@st.cache_data(show_spinner=False)
+def render_fig_png(fig_json, width, height):
+    # Keyed on the figure's JSON, so re-exporting an unchanged chart skips kaleido
+    import plotly.io as pio
+    return pio.to_image(pio.from_json(fig_json), format="png", width=width, height=height)
+
+@st.cache_data(show_spinner=False, hash_funcs=FRAME_HASH)
+def to_csv_bytes(df):
+    # pyarrow's C++ CSV writer, laid out like the pandas fallback: unquoted
+    # fields, all-midnight timestamp columns as plain dates and the rest at
+    # second resolution. pyarrow can only quote every string or none, so text
+    # that needs quoting, like mixed-type or duplicate columns, goes to pandas
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        columns = []
+        for column in table.columns:
+            if pa.types.is_timestamp(column.type):
+                dates = column.cast(pa.date32(), safe=False)
+                if pc.all(pc.equal(dates.cast(column.type), column)).as_py() is not False:
+                    column = dates
+                else:
+                    column = column.cast(pa.timestamp("s"), safe=False)
+            columns.append(column)
+        # pyarrow always quotes the header line, so pandas writes that one
+        buf = pa.BufferOutputStream()
+        buf.write(df.head(0).to_csv(index=False).encode("utf-8"))
+        write_options = pacsv.WriteOptions(include_header=False, quoting_style="none")
+        pacsv.write_csv(pa.table(columns, names=table.column_names), buf, write_options)
+        return buf.getvalue().to_pybytes()
+    except (pa.ArrowInvalid, pa.ArrowTypeError, ValueError):
+        # Encode chunk by chunk into one bytes buffer instead of a full str copy
+        buf = io.BytesIO()
+        df.to_csv(buf, index=False, encoding="utf-8", chunksize=50_000)
+        return buf.getvalue()
+
+def filter_investments(df, funds, realization, search_term):
+    # Apply filters as one combined mask, sliced once at the end
+    mask = df["Fund Name"].isin(funds).to_numpy()
+
+    # Apply Realized/Unrealized filter
+    if realization != "All" and "Realized / Unrealized" in df.columns:
+        mask &= (df["Realized / Unrealized"] == realization.lower()).to_numpy()
+
+    if search_term:
+        mask &= df["Investment Name"].str.contains(search_term, case=False, na=False, regex=False).to_numpy(dtype=bool)
+
+    return df.iloc[np.flatnonzero(mask)].reset_index(drop=True)
+
+def render_metrics(agg):
+    st.markdown("### :bar_chart: Summary")
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Total Amount Invested", format_currency(agg["cost"]), help="Sum of all capital deployed across filtered investments.")
+    col2.metric("Total Fair Value", format_currency(agg["fv"]), help="Current estimated value of all filtered investments.")
+    col3.metric("Portfolio MOIC", format_multiple(agg["moic"]), help="Multiple on Invested Capital (Fair Value / Cost)")
+    col4.metric("Portfolio-Level ROI", format_percent(agg["annualized_roi"], 1), help="Annualized return across all investments, weighted by capital")
+    col5.metric("DPI", format_multiple(agg["dpi"]), help="Distributed to Paid-In Capital: Realized cash returns relative to total invested")
 
 st.set_page_config(layout="wide", page_title="Investment Dashboard", page_icon="📊")
 
@@ -36,6 +421,8 @@ uploaded_file = st.file_uploader("Upload Investment Excel", type=["xlsx"])
 with st.expander("➕ Add Investment Manually", expanded=True):
     if "manual_entries" not in st.session_state:
         st.session_state.manual_entries = []
+    if "manual_df" not in st.session_state:
+        st.session_state.manual_df = None
 
     with st.form("manual_form"):
         col1, col2 = st.columns(2)
@@ -60,196 +447,142 @@ with st.expander("➕ Add Investment Manually", expanded=True):
                 "Realized / Unrealized": status
             }
             st.session_state.manual_entries.append(new_entry)
+            st.session_state.manual_df = None
             st.success(f"Added investment: {investment_name}")
 
     # 👇 This is OUTSIDE the form block now
-    if st.session_state.manual_entries:
+    # Entries accumulate as a list of dicts; the frame is only rebuilt after a change
+    if st.session_state.manual_entries and st.session_state.manual_df is None:
+        st.session_state.manual_df = pd.DataFrame(st.session_state.manual_entries)
+    manual_df = st.session_state.manual_df
+    if manual_df is not None:
         st.markdown("#### Manually Added Investments")
-        st.dataframe(pd.DataFrame(st.session_state.manual_entries))
+        st.dataframe(manual_df)
 
         if st.button("🧹 Clear Manual Entries"):
             st.session_state.manual_entries = []
+            st.session_state.manual_df = manual_df = None
             st.success("Manual entries cleared.")
 
-    if st.session_state.manual_entries:
-        st.markdown("#### Manually Added Investments")
-        st.dataframe(pd.DataFrame(st.session_state.manual_entries))
-
-        if st.button("🧹 Clear Manual Entries"):
-            st.session_state.manual_entries = []
-            st.success("Manual entries cleared.")
-    st.session_state.manual_entries.append(new_entry)
-    st.success(f"Added investment: {investment_name}")
-        if st.session_state.manual_entries:
-        st.markdown("#### Manually Added Investments")
-        st.dataframe(pd.DataFrame(st.session_state.manual_entries))
-            if st.button("🧹 Clear Manual Entries"):
-        st.session_state.manual_entries = []
-        st.success("Manual entries cleared.")
-
 # Realized / Unrealized filter
 st.markdown("### :mag: Filter Investments")
 realization_options = ["All", "Realized", "Unrealized"]
 realization_filter = st.radio("Show Investments:", realization_options, horizontal=True)
 
 if uploaded_file is not None:
-    df_excel = pd.read_excel(uploaded_file)
-    df_manual = pd.DataFrame(st.session_state.manual_entries)
-    df = pd.concat([df_excel, df_manual], ignore_index=True)
-    df.columns = df.columns.str.strip()  # Strip extra whitespace from headers
-
-    required_columns = ["Investment Name", "Cost", "Fair Value", "Date", "Fund Name"]
-    if not all(col in df.columns for col in required_columns):
-        st.error("Missing required columns in uploaded file. Please ensure headers match expected structure.")
+    df = load_investments(uploaded_file.getvalue(), st.session_state.manual_entries, datetime.today().date())
+
+    columns = set(df.columns)
+    has_status = "Realized / Unrealized" in columns
+    has_stage = "Stage" in columns
+    if not REQUIRED_COLUMNS <= columns:
+        missing = ", ".join(sorted(REQUIRED_COLUMNS - columns))
+        st.error(f"Missing required columns in uploaded file: {missing}. Please ensure headers match expected structure.")
     else:
-        df = df.dropna(subset=["Cost", "Fair Value", "Date"])
-        df["Date"] = pd.to_datetime(df["Date"], errors='coerce')
-        df = df.dropna(subset=["Date"])
-
-        df["MOIC"] = df["Fair Value"] / df["Cost"]
-
-        today = pd.Timestamp.today()
-        df["ROI"] = (df["Fair Value"] - df["Cost"]) / df["Cost"]
-        df["Years Held"] = (today - df["Date"]).dt.days / 365.25
-        df["Annualized ROI"] = df.apply(
-            lambda row: (row["MOIC"] ** (1 / row["Years Held"]) - 1) if row["Years Held"] > 0 else np.nan,
-            axis=1
-        )
 
-        unique_funds = sorted(df["Fund Name"].dropna().unique())
+        unique_funds = list(df["Fund Name"].cat.categories)
         selected_funds = st.multiselect("Select Fund(s)", options=unique_funds, default=unique_funds, key="fund_selector")
 
-        # Apply filters (FIXED + DEBUGGED)
-        df_filtered = df.copy()
-
-        # Apply Realized/Unrealized filter
-        if "Realized / Unrealized" in df_filtered.columns:
-            df_filtered["Realized / Unrealized"] = df_filtered["Realized / Unrealized"].astype(str).str.strip().str.lower()
-            if realization_filter != "All":
-                realization_filter_lower = realization_filter.lower()
-                df_filtered = df_filtered[df_filtered["Realized / Unrealized"] == realization_filter_lower]
-
-        # Apply Fund Name filter
-        df_filtered = df_filtered[df_filtered["Fund Name"].isin(selected_funds)]
-
-        df_filtered = df_filtered.reset_index(drop=True)
-
         # 🔍 Add search bar for investment name
         search_term = st.text_input("Search Investments by Name")
-        if search_term:
-            df_filtered = df_filtered[df_filtered["Investment Name"].str.contains(search_term, case=False, na=False)]
+
+        df_filtered = filter_investments(df, selected_funds, realization_filter, search_term)
 
         if df_filtered.empty:
             st.warning("No investments match the selected filters.")
         else:
-            total_invested = df_filtered["Cost"].sum()
-            total_fair_value = df_filtered["Fair Value"].sum()
+            # Column arrays are pulled once and shared by the totals, ROI and insights below
+            costs = df_filtered["Cost"].to_numpy(dtype=np.float64)
+            fair_values = df_filtered["Fair Value"].to_numpy(dtype=np.float64)
+            total_invested = float(costs.sum())
+            total_fair_value = float(fair_values.sum())
             portfolio_moic = total_fair_value / total_invested if total_invested != 0 else 0
-            portfolio_roi = (total_fair_value - total_invested) / total_invested
-            total_days = (today - df_filtered["Date"].min()).days
-            df_filtered["Weighted Annualized ROI Contribution"] = df_filtered.apply(
-                lambda row: row["Annualized ROI"] * row["Cost"] if pd.notnull(row["Annualized ROI"]) else 0,
-                axis=1
-            )
-            portfolio_annualized_roi = df_filtered["Weighted Annualized ROI Contribution"].sum() / df_filtered["Cost"].sum()
-
-            st.markdown("### :bar_chart: Summary")
-            col1, col2, col3, col4, col5 = st.columns(5)
-            col1.metric("Total Amount Invested", format_currency(total_invested), help="Sum of all capital deployed across filtered investments.")
-            col2.metric("Total Fair Value", format_currency(total_fair_value), help="Current estimated value of all filtered investments.")
-            col3.metric("Portfolio MOIC", format_multiple(portfolio_moic), help="Multiple on Invested Capital (Fair Value / Cost)")
-            col4.metric("Portfolio-Level ROI", format_percent(portfolio_annualized_roi, 1), help="Annualized return across all investments, weighted by capital")
-
-            realized_df = df_filtered[df_filtered["Realized / Unrealized"] == "realized"] if "Realized / Unrealized" in df_filtered.columns else pd.DataFrame()
-            unrealized_df = df_filtered[df_filtered["Realized / Unrealized"] == "unrealized"] if "Realized / Unrealized" in df_filtered.columns else pd.DataFrame()
-
-            realized_distributions = realized_df["Fair Value"].sum() if not realized_df.empty else 0
-            residual_value = unrealized_df["Fair Value"].sum() if not unrealized_df.empty else 0
+            contribution = df_filtered["Annualized ROI"].to_numpy(dtype=np.float64) * costs
+            # A view with no capital deployed has no meaningful return; exit
+            # with NaN instead of dividing by zero and rendering inf/nan
+            if total_invested != 0:
+                portfolio_roi = (total_fair_value - total_invested) / total_invested
+                portfolio_annualized_roi = np.nansum(contribution) / total_invested
+            else:
+                portfolio_roi = np.nan
+                portfolio_annualized_roi = np.nan
+
+            # Masked sums over the status category codes; missing statuses (-1) count as neither
+            if has_status:
+                status = df_filtered["Realized / Unrealized"].cat
+                status_codes = status.codes.to_numpy()
+                realized_distributions = float(fair_values[status_codes == status.categories.get_loc("realized")].sum())
+                residual_value = float(fair_values[status_codes == status.categories.get_loc("unrealized")].sum())
+            else:
+                realized_distributions = residual_value = 0
             dpi = realized_distributions / total_invested if total_invested != 0 else np.nan
             tvpi = (realized_distributions + residual_value) / total_invested if total_invested != 0 else np.nan
 
-            col5.metric("DPI", format_multiple(dpi), help="Distributed to Paid-In Capital: Realized cash returns relative to total invested")
+            # Every headline scalar is computed once above and shared from here
+            agg = {
+                "cost": total_invested,
+                "fv": total_fair_value,
+                "moic": portfolio_moic,
+                "annualized_roi": portfolio_annualized_roi,
+                "dpi": dpi,
+                "n": len(df_filtered),
+            }
+            render_metrics(agg)
             
             st.markdown("---")
-            
+
+            # Figures are only built for the sections shown; the PDF embeds whichever exist
+            fig4 = fig_cost_value = None
+
             st.subheader(":bar_chart: Portfolio MOIC by Fund")
-            moic_by_fund = df_filtered.groupby("Fund Name").apply(lambda x: x["Fair Value"].sum() / x["Cost"].sum()).reset_index(name="Portfolio MOIC")
-            moic_by_fund["MOIC Label"] = moic_by_fund["Portfolio MOIC"].round(2).astype(str) + "x"
-            fig1 = px.bar(moic_by_fund, x="Fund Name", y="Portfolio MOIC", title="MOIC per Fund", text="MOIC Label")
+            fund_sums = summarize_by_fund(df_filtered[["Fund Name", "Cost", "Fair Value", "Annualized ROI"]])
+            fig1 = build_moic_by_fund_fig(fund_sums)
             st.plotly_chart(fig1, use_container_width=True)
 
             st.subheader(":chart_with_upwards_trend: Annualized ROI by Fund")
-            roi_fund = df_filtered.groupby("Fund Name").apply(
-                lambda x: np.average(x["Annualized ROI"], weights=x["Cost"]) if x["Cost"].sum() > 0 else np.nan
-            ).reset_index(name="Weighted Annualized ROI")
-            roi_fund["Annualized ROI Label"] = roi_fund["Weighted Annualized ROI"].apply(lambda x: f"{x:.1%}" if pd.notnull(x) else "N/A")
-            fig2 = px.bar(
-                roi_fund,
-                x="Fund Name",
-                y="Weighted Annualized ROI",
-                title="Weighted Annualized ROI per Fund",
-                text="Annualized ROI Label"
-            )
+            fig2 = build_roi_by_fund_fig(fund_sums)
             st.plotly_chart(fig2, use_container_width=True)
 
             st.subheader(":moneybag: Capital Allocation by Fund")
-            pie_df = df_filtered.groupby("Fund Name")["Cost"].sum().reset_index()
-            fig3 = px.pie(pie_df, names="Fund Name", values="Cost", title="Capital Invested per Fund")
+            fig3 = build_allocation_fig(fund_sums)
             st.plotly_chart(fig3, use_container_width=True)
 
-            if "Stage" in df_filtered.columns:
+            if has_stage:
                 st.subheader(":dna: Investments by Stage")
-                stage_df = df_filtered.groupby("Stage")["Cost"].sum().reset_index()
-                fig4 = px.pie(stage_df, names="Stage", values="Cost", title="Investments by Stage")
+                fig4 = build_stage_fig(df_filtered[["Stage", "Cost"]])
                 st.plotly_chart(fig4, use_container_width=True)
 
             if not search_term:
                 st.subheader(":bar_chart: Cost Basis vs Fair Value Since Inception")
                 chart_mode = st.selectbox("Chart Mode", ["Cumulative", "Monthly Deployed"], index=0)
                 if chart_mode == "Cumulative":
-                    df_filtered["Date Group"] = df_filtered["Date"].dt.to_period("M").dt.to_timestamp()
-                    cost_value_df = df_filtered.groupby("Date Group")[["Cost", "Fair Value"]].sum().sort_index().cumsum().reset_index()
-                    fig_cost_value = px.line(cost_value_df, x="Date Group", y=["Cost", "Fair Value"], title="Cumulative Cost vs Fair Value Over Time", )
+                    fig_cost_value = build_timeline_fig(df_filtered[["Date", "Cost", "Fair Value"]])
                     st.plotly_chart(fig_cost_value, use_container_width=True)
                 else:
-                    df_filtered["Month"] = df_filtered["Date"].dt.to_period("M").dt.to_timestamp()
-                    monthly_df = df_filtered.groupby("Month")["Cost"].sum().reset_index()
-                    fig_deployed = px.bar(monthly_df, x="Month", y="Cost", title="Monthly Deployed", )
+                    fig_deployed = build_monthly_fig(df_filtered[["Date", "Cost"]])
                     st.plotly_chart(fig_deployed, use_container_width=True)
             else:
                 st.subheader(":bar_chart: Cost vs Fair Value (Filtered View)")
-                search_chart_df = df_filtered.groupby("Investment Name")[["Cost", "Fair Value"]].sum().reset_index().melt(
-                    id_vars="Investment Name",
-                    var_name="Metric",
-                    value_name="Amount"
-                )
-                fig_bar_filtered = px.bar(
-                    search_chart_df,
-                    x="Investment Name",
-                    y="Amount",
-                    color="Metric",
-                    barmode="group",
-                    title="Cost vs Fair Value for Selected Investments",
-                    
-                )
+                fig_bar_filtered = build_search_fig(df_filtered[["Investment Name", "Cost", "Fair Value"]])
                 st.plotly_chart(fig_bar_filtered, use_container_width=True)
 
             # 💰 Top Value Creators (by $ gain)
-            df_filtered["$ Gain"] = df_filtered["Fair Value"] - df_filtered["Cost"]
-            top_gainers = df_filtered.sort_values("$ Gain", ascending=False).head(3)["Investment Name"].tolist()
+            gain = fair_values - costs
+            df_filtered["$ Gain"] = gain
+            investment_names = df_filtered["Investment Name"].to_numpy(dtype=object)
+            top_gainers = top_k_names(gain, investment_names)
 
             # 📉 Biggest Losses (by $ loss)
-            df_filtered["$ Loss"] = df_filtered["Cost"] - df_filtered["Fair Value"]
-            df_filtered_loss_only = df_filtered[df_filtered["$ Loss"] > 0]
-            top_losers = df_filtered_loss_only.sort_values("$ Loss", ascending=False).head(3)["Investment Name"].tolist()
+            is_loss = gain < 0
+            top_losers = top_k_names(-gain[is_loss], investment_names[is_loss])
 
             # 🏋️ Highest Conviction (by Cost)
-            top_allocations = df_filtered.sort_values("Cost", ascending=False).head(3)["Investment Name"].tolist()
+            top_allocations = top_k_names(costs, investment_names)
 
             # ⚡ Most Efficient (low cost, high ROI)
-            efficient_df = df_filtered[df_filtered["Cost"] < df_filtered["Cost"].median()]  # small bets
-            efficient_df = efficient_df[efficient_df["Annualized ROI"].notnull()]
-            top_efficient = efficient_df.sort_values("Annualized ROI", ascending=False).head(3)["Investment Name"].tolist()
+            annualized_roi = df_filtered["Annualized ROI"].to_numpy(dtype=np.float64)
+            is_efficient = (costs < np.median(costs)) & ~np.isnan(annualized_roi)  # small bets with a return
+            top_efficient = top_k_names(annualized_roi[is_efficient], investment_names[is_efficient])
 
             st.markdown(f"**💰 Largest Value Gains:** {', '.join(top_gainers)}")
             st.markdown(f"**📉 Largest Losses:** {', '.join(top_losers) if top_losers else 'None'}")
@@ -259,76 +592,73 @@ if uploaded_file is not None:
             def highlight(val):
                 return "background-color: #ffe6e6" if isinstance(val, float) and val < 0 else ""
 
-            st.markdown(f"### :abacus: Investment Table – Investments in View: {len(df_filtered)}")
-            df_filtered["MOIC"] = df_filtered["MOIC"].round(2).astype(str) + "x"
-            df_filtered_display = df_filtered.copy()
-            df_filtered_display["Cost"] = df_filtered_display["Cost"].apply(lambda x: f"${x:,.0f}")
-            df_filtered_display["Fair Value"] = df_filtered_display["Fair Value"].apply(lambda x: f"${x:,.0f}")
-            df_filtered_display["ROI"] = df_filtered_display["ROI"].apply(lambda x: f"{x:.2%}")
-            df_filtered_display["Annualized ROI"] = df_filtered_display["Annualized ROI"].apply(lambda x: f"{x:.2%}" if pd.notnull(x) else "N/A")
+            st.markdown(f"### :abacus: Investment Table – Investments in View: {agg['n']}")
+            # Copy only the columns the table shows, not the whole filtered frame.
+            # Values stay numeric; the Styler formats them lazily at render time.
+            table_columns = ["Investment Name", "Fund Name", "Cost", "Fair Value", "MOIC", "ROI", "Annualized ROI"]
+            df_filtered_display = df_filtered[table_columns].copy()
             summary_row = pd.DataFrame({
                 "Investment Name": ["Total"],
                 "Fund Name": ["-"],
-                "Cost": [f"${df_filtered['Cost'].sum():,.0f}"],
-                "Fair Value": [f"${df_filtered['Fair Value'].sum():,.0f}"],
-                "MOIC": [f"{portfolio_moic:.2f}x"],
-                "ROI": [f"{portfolio_roi:.2%}"],
-                "Annualized ROI": [f"{portfolio_annualized_roi:.2%}" if not np.isnan(portfolio_annualized_roi) else "N/A"]
+                "Cost": [total_invested],
+                "Fair Value": [total_fair_value],
+                "MOIC": [portfolio_moic],
+                "ROI": [portfolio_roi],
+                "Annualized ROI": [portfolio_annualized_roi]
             })
-            df_with_total = pd.concat([
-                df_filtered_display[["Investment Name", "Fund Name", "Cost", "Fair Value", "MOIC", "ROI", "Annualized ROI"]],
-                summary_row
-            ], ignore_index=True)
-            def style_moic(val):
-                try:
-                    val_float = float(val.replace("x", ""))
-                    if val_float >= 2:
-                        return "background-color: #d4edda"  # green
-                    elif val_float >= 1:
-                        return "background-color: #fff3cd"  # yellow
-                    else:
-                        return "background-color: #f8d7da"  # red
-                except:
-                    return ""
-
-            def style_roi(val):
-                try:
-                    val_float = float(val.strip('%')) / 100
-                    if val_float >= 0.20:
-                        return "background-color: #d4edda"
-                    elif val_float >= 0.10:
-                        return "background-color: #fff3cd"
-                    else:
-                        return "background-color: #f8d7da"
-                except:
-                    return ""
-
-            styled_df = df_with_total.style.applymap(style_moic, subset=["MOIC"]).applymap(style_roi, subset=["ROI"])
+            df_with_total = pd.concat([df_filtered_display, summary_row], ignore_index=True)
+            # Bins are computed once here and shared by the Styler and the PDF table
+            table_bins = {col: color_bins(df_with_total[col], edges, COLOR_DECIMALS[col]) for col, edges in COLOR_EDGES.items()}
+            css_palette = np.array([
+                "background-color: #f8d7da",  # red
+                "background-color: #fff3cd",  # yellow
+                "background-color: #d4edda",  # green
+                "",
+            ])
+
+            table_formats = {
+                "Cost": "${:,.0f}",
+                "Fair Value": "${:,.0f}",
+                "MOIC": "{:.2f}x",
+                "ROI": "{:.2%}",
+                "Annualized ROI": "{:.2%}",
+            }
+
+            def style_table(frame, bins):
+                return frame.style.format(table_formats, na_rep="N/A").apply(
+                    lambda col: css_palette[bins[col.name]], subset=["MOIC", "ROI"]
+                )
+
+            styled_df = style_table(df_with_total, table_bins)
             st.dataframe(styled_df)
 
             if download_csv:
-                csv = df_filtered.to_csv(index=False).encode('utf-8')
+                csv = to_csv_bytes(df_filtered)
                 st.download_button("⬇️ Click to Save CSV", data=csv, file_name="investment_summary.csv", mime="text/csv")
 
             if download_pdf:
-                from PIL import Image
-                import plotly.io as pio
-                import os
-                import tempfile
-
-                pio.kaleido.scope.default_format = "png"
+                from fpdf import FPDF, XPos, YPos
+                from fpdf.fonts import FontFace
 
                 buffer_dir = tempfile.mkdtemp()
-                chart_paths = []
                 chart_titles = ["MOIC by Fund", "Annualized ROI by Fund", "Capital Allocation", "Stage Breakdown", "Cost vs Fair Value Over Time" ]
 
-                figs = [fig1, fig2, fig3, fig4 if 'fig4' in locals() else None, fig_cost_value if 'fig_cost_value' in locals() else None]
+                figs = [fig1, fig2, fig3, fig4, fig_cost_value]
 
-                for i, fig in enumerate(figs):
-                    if fig:
-                        path = os.path.join(buffer_dir, f"chart_{i}.png")
-                        pio.write_image(fig, path, format='png', width=1000, height=600)
-                        chart_paths.append((chart_titles[i], path))
+                chart_jobs = [
+                    (chart_titles[i], fig, os.path.join(buffer_dir, f"chart_{i}.png"))
+                    for i, fig in enumerate(figs) if fig is not None
+                ]
+
+                def export_chart(job):
+                    title, fig, path = job
+                    with open(path, "wb") as f:
+                        f.write(render_fig_png(fig.to_json(), 1000, 600))
+                    return title, path
+
+                # Chart exports are independent; overlap them and keep the original order
+                with ThreadPoolExecutor(max_workers=max(len(chart_jobs), 1)) as pool:
+                    chart_paths = list(pool.map(export_chart, chart_jobs))
 
                 pdf = FPDF()
                 pdf.set_auto_page_break(auto=True, margin=15)
@@ -336,25 +666,28 @@ if uploaded_file is not None:
                 
 
                 # Cover
-                pdf.set_font("Arial", 'B', 20)
+                pdf.set_font("Helvetica", 'B', 20)
                 pdf.set_text_color(30, 30, 30)
-                pdf.cell(200, 20, txt="Investment Dashboard Report", ln=True, align="C")
+                pdf.cell(200, 20, text="Investment Dashboard Report", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
                 pdf.ln(10)
 
                 # Summary
-                pdf.set_font("Arial", '', 12)
+                pdf.set_font("Helvetica", '', 12)
                 pdf.set_text_color(0, 0, 0)
-                pdf.cell(0, 10, txt=f"Total Invested: ${total_invested:,.0f}", ln=True)
-                pdf.cell(0, 10, txt=f"Total Fair Value: ${total_fair_value:,.0f}", ln=True)
-                pdf.cell(0, 10, txt=f"Portfolio MOIC: {portfolio_moic:.2f}x", ln=True)
-                pdf.cell(0, 10, txt=f"Annualized ROI: {portfolio_annualized_roi:.2%}", ln=True)
-                pdf.cell(0, 10, txt=f"DPI: {dpi:.2f}x" if not np.isnan(dpi) else "DPI: N/A", ln=True)
+                summary_text = [
+                    f"Total Invested: ${total_invested:,.0f}",
+                    f"Total Fair Value: ${total_fair_value:,.0f}",
+                    f"Portfolio MOIC: {portfolio_moic:.2f}x",
+                    f"Annualized ROI: {format_percent(portfolio_annualized_roi)}",
+                    f"DPI: {dpi:.2f}x" if not np.isnan(dpi) else "DPI: N/A",
+                ]
+                pdf.multi_cell(0, 10, "\n".join(summary_text))
                 pdf.ln(5)
 
-                pdf.set_font("Arial", 'I', 10)
+                pdf.set_font("Helvetica", 'I', 10)
                 pdf.set_text_color(100, 100, 100)
-                pdf.cell(0, 10, txt=f"Filtered Funds: {', '.join(selected_funds)}", ln=True)
-                pdf.cell(0, 10, txt=f"Investment Status: {realization_filter}", ln=True)
+                pdf.cell(0, 10, text=f"Filtered Funds: {', '.join(selected_funds)}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+                pdf.cell(0, 10, text=f"Investment Status: {realization_filter}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
                 pdf.set_text_color(0, 0, 0)
                 pdf.ln(10)
 
@@ -362,60 +695,55 @@ if uploaded_file is not None:
                     pdf.add_page()
                     charts = chart_paths[i:i+2]
                     for j, (title, path) in enumerate(charts):
-                        pdf.set_font("Arial", 'B', 14)
+                        pdf.set_font("Helvetica", 'B', 14)
                         y_offset = 10 + j * 140
                         pdf.set_y(y_offset)
-                        pdf.cell(0, 10, title, ln=True)
+                        pdf.cell(0, 10, title, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
                         pdf.image(path, x=10, y=y_offset + 10, w=180)
                     pdf.ln(8)
 
                 pdf.add_page()
-                pdf.set_font("Arial", 'B', 14)
-                pdf.cell(0, 10, "Investment Table", ln=True)
-                pdf.set_font("Arial", '', 10)
+                pdf.set_font("Helvetica", 'B', 14)
+                pdf.cell(0, 10, "Investment Table", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+                pdf.set_font("Helvetica", '', 10)
+                # Both branches below draw the same report: these six columns,
+                # formatted and clipped once, with MOIC and Annualized ROI coloured
                 col_headers = ["Investment Name", "Fund Name", "Cost", "Fair Value", "MOIC", "Annualized ROI"]
-                col_widths = [40, 50, 25, 30, 20, 45]
-                for i, header in enumerate(col_headers):
-                    pdf.cell(col_widths[i], 10, header, border=1)
-                pdf.ln()
-                for _, row in df_with_total.iterrows():
-                    for i, col in enumerate(col_headers):
-                        cell_text = str(row[col])[:20]
-                        bg_color = None
-
-                        if col == "MOIC":
-                            try:
-                                moic_val = float(row[col].replace("x", ""))
-                                if moic_val >= 2:
-                                    bg_color = (212, 237, 218)  # green
-                                elif moic_val >= 1:
-                                    bg_color = (255, 243, 205)  # yellow
-                                else:
-                                    bg_color = (248, 215, 218)  # red
-                            except:
-                                pass
-
-                        if col == "Annualized ROI":
-                            try:
-                                roi_val = float(row[col].replace("%", "")) / 100
-                                if roi_val >= 0.20:
-                                    bg_color = (212, 237, 218)
-                                elif roi_val >= 0.10:
-                                    bg_color = (255, 243, 205)
-                                else:
-                                    bg_color = (248, 215, 218)
-                            except:
-                                pass
-
-                        if bg_color:
-                            pdf.set_fill_color(*bg_color)
-                            pdf.cell(col_widths[i], 10, cell_text, border=1, fill=True)
-                        else:
-                            pdf.cell(col_widths[i], 10, cell_text, border=1)
-                    pdf.ln()
-
-                pdf_output = os.path.join(buffer_dir, "investment_report.pdf")
-                pdf.output(pdf_output)
-
-                with open(pdf_output, "rb") as f:
-                    st.download_button("⬇️ Download PDF Report", data=f, file_name="investment_report.pdf", mime="application/pdf")
+                pdf_bins = {col: table_bins[col] for col in ("MOIC", "Annualized ROI")}
+                pdf_table = df_with_total[col_headers].assign(
+                    **{
+                        "Cost": format_currency_column(df_with_total["Cost"]),
+                        "Fair Value": format_currency_column(df_with_total["Fair Value"]),
+                        "MOIC": format_float_column(df_with_total["MOIC"], "%.2fx"),
+                        "Annualized ROI": format_float_column(df_with_total["Annualized ROI"] * 100, "%.2f%%"),
+                    }
+                )
+                # Stringify and clip the whole table in one pass
+                pdf_table = pdf_table.astype(str).apply(lambda col: col.str[:20])
+                if dfi is not None and len(pdf_table) >= PDF_TABLE_IMAGE_MIN_ROWS:
+                    # One raster per page instead of rows x columns cell calls
+                    for start in range(0, len(pdf_table), PDF_TABLE_ROWS_PER_IMAGE):
+                        stop = start + PDF_TABLE_ROWS_PER_IMAGE
+                        page_styler = pdf_table.iloc[start:stop].style.apply(
+                            lambda col: css_palette[pdf_bins[col.name][start:stop]], subset=list(pdf_bins)
+                        ).hide(axis="index")
+                        path = os.path.join(buffer_dir, f"table_{start}.png")
+                        dfi.export(page_styler, path, table_conversion="matplotlib", max_rows=-1)
+                        if start:
+                            pdf.add_page()
+                        pdf.image(path, x=10, w=190)
+                else:
+                    col_widths = (40, 50, 25, 30, 20, 45)
+                    table_rows = pdf_table.to_numpy().tolist()
+                    cell_colors = ((248, 215, 218), (255, 243, 205), (212, 237, 218))  # red, yellow, green
+                    cell_styles = [FontFace(fill_color=color) for color in cell_colors] + [None]  # -1 picks None
+                    with pdf.table(col_widths=col_widths, line_height=10, text_align="LEFT") as table:
+                        table.row(col_headers)
+                        for row_idx, values in enumerate(table_rows):
+                            row = table.row()
+                            for col, text in zip(col_headers, values):
+                                bins = pdf_bins.get(col)
+                                row.cell(text, style=cell_styles[bins[row_idx]] if bins is not None else None)
+
+                pdf_bytes = bytes(pdf.output())
+                st.download_button("⬇️ Download PDF Report", data=pdf_bytes, file_name="investment_report.pdf", mime="application/pdf")